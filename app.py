@@ -12,8 +12,12 @@ from dash_table import DataTable
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from analytics import *
+from table_cache import PairsTableCache
+from rolling_analytics import RollingAnalytics
 
 a = Analytics()
+pairs_cache = PairsTableCache()
+ra = RollingAnalytics(max_points=1000)
 tickers = a.dc.get_tickers()
 
 ticker_options = [{"label": ticker, "value": ticker} for ticker in tickers]
@@ -75,7 +79,33 @@ app.layout = dbc.Container(
             dbc.CardBody(
                 [
                     html.H4('Top Pairs', style=card_header_style),
-                    html.Div(id='pairs')
+                    dcc.Store(id='pairs-query'),
+                    # Rows stay on the server, update_pairs_page serves them one page at a time
+                    html.Div(
+                        DataTable(
+                            id='pairs-table',
+                            columns=[],
+                            data=[],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={
+                                'textAlign': 'left',
+                                'padding': '5px'
+                            },
+                            style_header={
+                                'backgroundColor': 'lightgrey',
+                                'fontWeight': 'bold'
+                            },
+                            page_action='custom',
+                            page_current=0,
+                            page_size=10,
+                            filter_action='custom',
+                            filter_query='',
+                            sort_action='custom',
+                            sort_by=[]
+                        ),
+                        id='pairs',
+                        style={'display': 'none'}
+                    )
                 ]
             ),
             className="mb-4"
@@ -170,41 +200,67 @@ app.layout = dbc.Container(
     fluid=True
 )
 
+def compute_top_pairs(query, analytics):
+    """
+    Compute the ranked pairs for a stored query and cache them.
+    """
+    corr_method, top_n, start_date, end_date = query
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    # Pull data
+    analytics.set_data_df(start_date, end_date)
+
+    top_pairs = analytics.get_output_df(corr_method, top_n).round(3)
+    pairs_cache.set_pairs(tuple(query), top_pairs)
+    return top_pairs
+
 @app.callback(
-    Output("pairs", "children"),
+    [Output("pairs", "style"),
+     Output("pairs-table", "columns"),
+     Output("pairs-table", "sort_by"),
+     Output("pairs-table", "filter_query"),
+     Output("pairs-query", "data")],
     [Input("submit-button", "n_clicks")],
     [State("correlation_method", "value"), State("top_n", "value"), State("date-picker", "start_date"), State("date-picker", "end_date")]
 )
 def update_dashboard(n_clicks, corr_method, top_n, start_date, end_date):
     # Correlation app
     if n_clicks > 0:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        query = [corr_method, top_n, start_date, end_date]
+        top_pairs = compute_top_pairs(query, a)
 
-        # Pull data
-        a.set_data_df(start_date, end_date)
-        
-        top_pairs = a.get_output_df(corr_method, top_n).round(3)
+        columns = [{"name": i, "id": i} for i in top_pairs.columns]
+        return {}, columns, [], '', query
 
-        pairs = DataTable(
-            columns=[{"name": i, "id": i} for i in top_pairs.columns],
-            data=top_pairs.to_dict('records'),
-            style_table={'overflowX': 'auto'},
-            style_cell={
-                'textAlign': 'left',
-                'padding': '5px'
-            },
-            style_header={
-                'backgroundColor': 'lightgrey',
-                'fontWeight': 'bold'
-            },
-            page_action='native',
-            page_size=10,
-            filter_action='native',
-            sort_action='native'
-        )
+    return {'display': 'none'}, [], [], '', None
+
+@app.callback(
+    [Output("pairs-table", "data"),
+     Output("pairs-table", "page_count"),
+     Output("pairs-table", "page_current")],
+    [Input("pairs-table", "page_current"), Input("pairs-table", "page_size"),
+     Input("pairs-table", "sort_by"), Input("pairs-table", "filter_query"),
+     Input("pairs-query", "data")]
+)
+def update_pairs_page(page_current, page_size, sort_by, filter_query, query):
+    # Serve one page of the cached top pairs
+    if not query:
+        return [], 1, 0
+
+    # A new query, sort or filter starts again from the first page
+    triggered = {t["prop_id"] for t in dash.callback_context.triggered}
+    if triggered & {"pairs-query.data", "pairs-table.sort_by", "pairs-table.filter_query"}:
+        page_current = 0
+
+    # An evicted query, or one submitted to another worker, is rebuilt on its own
+    # Analytics instance so the shared data frame used by the backtest is left alone
+    if pairs_cache.get_pairs(tuple(query)) is None:
+        compute_top_pairs(query, Analytics())
 
-        return pairs
+    # The served page is returned to the table so the pager never shows a page past the end
+    data, page_count, page_current = pairs_cache.get_page(tuple(query), page_current, page_size, sort_by, filter_query)
+    return data or [], page_count or 1, page_current
 
 @app.callback(
     [Output("performance-metrics", "children"),
@@ -246,16 +302,15 @@ def update_dashboard1(n_bt_clicks, start_date, end_date, ticker1, ticker2, lookb
             sort_action='native'
         )
 
-        ret_df = output["filtered_df"].loc[:, [ticker1, ticker2]]
-        ret_df = (ret_df / ret_df.shift(1) - 1).dropna()
-        ret_df["rolling_correlation"] = ret_df[ticker1].rolling(lookback).corr(ret_df[ticker2])
-        ret_df.dropna(inplace=True)
+        rolling_stats = ra.rolling_pair_stats(output["filtered_df"].loc[:, [ticker1, ticker2]], [(ticker1, ticker2)], [lookback])
+        rolling_correlation = ra.downsample(rolling_stats[lookback]["corr"][(ticker1, ticker2)])
 
         correlation_figure = go.Figure()
-        correlation_figure.add_trace(go.Scatter(x=ret_df.index, y=ret_df["rolling_correlation"], name="Rolling Correlation"))
+        correlation_figure.add_trace(go.Scatter(x=rolling_correlation.index, y=rolling_correlation, name="Rolling Correlation"))
     
+        total_pnl = ra.downsample(output["filtered_df"]["total_pnl"])
         backtest_figure = go.Figure()
-        backtest_figure.add_trace(go.Scatter(x=output["filtered_df"].index, y=output["filtered_df"]["total_pnl"], name="Cumulative Returns"))
+        backtest_figure.add_trace(go.Scatter(x=total_pnl.index, y=total_pnl, name="Cumulative Returns"))
 
         return performance_table, correlation_figure, backtest_figure
     
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+class RollingAnalytics():
+    """
+    A class to compute rolling pair statistics and downsample series for plotting.
+    """
+
+    def __init__(self, max_points=1000, chunk_size=256):
+        """
+        Initialize with the number of points a plotted series is reduced to
+        and the number of pairs processed together.
+        """
+        self.max_points = max_points
+        self.chunk_size = chunk_size
+
+    def cumulative_moments(self, x, y=None):
+        """
+        Cumulative sums of the first and second moments of x and y, skipping NaNs.
+        Without y only the moments of x are accumulated.
+        Each array has a leading zero row so window sums are S[t] - S[t - window].
+        """
+        valid = ~np.isnan(x) if y is None else ~(np.isnan(x) | np.isnan(y))
+        x = np.where(valid, x, 0.0)
+        moments = {
+            "n": valid.astype(float),
+            "x": x,
+            "xx": x * x
+        }
+        if y is not None:
+            y = np.where(valid, y, 0.0)
+            moments.update({"y": y, "yy": y * y, "xy": x * y})
+
+        zeros = np.zeros((1,) + x.shape[1:])
+        return {name: np.concatenate([zeros, np.cumsum(value, axis=0)]) for name, value in moments.items()}
+
+    def window_sums(self, moments, window):
+        """
+        Rolling window sums from cumulative moments, NaN until a full window is available.
+        """
+        sums = {}
+        for name, cum in moments.items():
+            total = np.full((cum.shape[0] - 1,) + cum.shape[1:], np.nan)
+            if window <= total.shape[0]:
+                total[window - 1:] = cum[window:] - cum[:-window]
+            sums[name] = total
+
+        # Match pandas rolling, which needs a full window of valid observations
+        full = sums["n"] == window
+        for name in sums:
+            sums[name] = np.where(full, sums[name], np.nan)
+        return sums
+
+    def rolling_zscore(self, x, window):
+        """
+        Rolling z-score of each column of x, NaN until a full window of valid observations.
+        Moments are accumulated in blocks of one window, each centred on its own mean, so
+        long trending series do not lose precision to one cumulative sum over the whole sample.
+        """
+        rows = len(x)
+        zscore = np.full(x.shape, np.nan)
+        if window > rows or window < 2:
+            return zscore
+
+        # Split into blocks of one window and centre each block on its mean
+        n_blocks = -(-rows // window)
+        padded = np.full((n_blocks * window,) + x.shape[1:], np.nan)
+        padded[:rows] = x
+        blocks = padded.reshape((n_blocks, window) + x.shape[1:])
+        valid = ~np.isnan(blocks)
+        counts = valid.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            centres = np.where(counts > 0, np.where(valid, blocks, 0.0).sum(axis=1) / counts, 0.0)
+        centred = np.where(valid, blocks - centres[:, None], 0.0)
+
+        # Within-block cumulative moments and block totals
+        moments = [valid.astype(float), centred, centred * centred]
+        cum = [np.cumsum(m, axis=1).reshape(padded.shape) for m in moments]
+        totals = [c.reshape(blocks.shape)[:, -1] for c in cum]
+
+        ends = np.arange(window - 1, rows)
+        starts = ends - window + 1
+        end_block, start_block = ends // window, starts // window
+        before = np.maximum(starts - 1, 0)
+        in_block = (starts % window != 0)[:, None]
+
+        # Window sums are the end block's part plus, when the window straddles two blocks,
+        # the start block's tail shifted from its centre to the end block's centre
+        head = [c[ends] for c in cum]
+        tail = [np.where(in_block, t[start_block] - c[before], t[start_block]) for c, t in zip(cum, totals)]
+        straddles = (start_block != end_block)[:, None]
+        head = [np.where(straddles, h, h - np.where(in_block, c[before], 0.0)) for h, c in zip(head, cum)]
+        tail = [np.where(straddles, t, 0.0) for t in tail]
+
+        shift = centres[end_block] - centres[start_block]
+        n = head[0] + tail[0]
+        s1 = head[1] + tail[1] - tail[0] * shift
+        s2 = head[2] + tail[2] - 2 * shift * tail[1] + tail[0] * shift ** 2
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / n
+            std = np.sqrt(np.maximum(s2 - s1 * mean, 0) / (n - 1))
+            current = x[ends] - centres[end_block]
+            zscore[ends] = np.where(n == window, (current - mean) / std, np.nan)
+        return zscore
+
+    def pair_chunk_stats(self, prices, idx1, idx2, windows):
+        """
+        Calculate rolling correlation, beta and price ratio z-score arrays for one chunk of pairs.
+        """
+        price1, price2 = prices[:, idx1], prices[:, idx2]
+
+        returns1 = np.full_like(price1, np.nan)
+        returns2 = np.full_like(price2, np.nan)
+        returns1[1:] = price1[1:] / price1[:-1] - 1
+        returns2[1:] = price2[1:] / price2[:-1] - 1
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = price1 / price2
+        ratio = np.where(np.isfinite(ratio), ratio, np.nan)
+
+        return_moments = self.cumulative_moments(returns1, returns2)
+
+        results = {}
+        for window in windows:
+            sums = self.window_sums(return_moments, window)
+            n = sums["n"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = sums["xy"] - sums["x"] * sums["y"] / n
+                var_x = sums["xx"] - sums["x"] ** 2 / n
+                var_y = sums["yy"] - sums["y"] ** 2 / n
+                corr = cov / np.sqrt(var_x * var_y)
+                beta = cov / var_y
+
+            results[window] = {"corr": corr, "beta": beta, "zscore": self.rolling_zscore(ratio, window)}
+
+        return results
+
+    def rolling_pair_stats(self, prices_df, pairs, windows):
+        """
+        Calculate rolling correlation, beta and price ratio z-score for many pairs and windows.
+        Pairs are processed chunk_size at a time to bound the working memory.
+        Returns {window: {"corr": df, "beta": df, "zscore": df}} with one column per pair.
+        """
+        pairs = [tuple(pair) for pair in pairs]
+        columns = pd.MultiIndex.from_tuples(pairs, names=["Ticker1", "Ticker2"])
+
+        prices = prices_df.to_numpy(dtype=float)
+        position = {ticker: i for i, ticker in enumerate(prices_df.columns)}
+        idx1 = np.array([position[pair[0]] for pair in pairs], dtype=int)
+        idx2 = np.array([position[pair[1]] for pair in pairs], dtype=int)
+
+        stats = ["corr", "beta", "zscore"]
+        outputs = {window: {stat: np.empty((len(prices), len(pairs))) for stat in stats} for window in windows}
+        for start in range(0, len(pairs), self.chunk_size):
+            end = start + self.chunk_size
+            chunk = self.pair_chunk_stats(prices, idx1[start:end], idx2[start:end], windows)
+            for window in windows:
+                for stat in stats:
+                    outputs[window][stat][:, start:end] = chunk[window][stat]
+
+        return {
+            window: {stat: pd.DataFrame(outputs[window][stat], index=prices_df.index, columns=columns) for stat in stats}
+            for window in windows
+        }
+
+    def lttb(self, x, y, n_out):
+        """
+        Largest-Triangle-Three-Buckets downsampling, returns the positions of the kept points.
+        """
+        n = len(x)
+        if n_out >= n or n_out < 3:
+            return np.arange(n)
+
+        # Bucket edges for the points between the first and last
+        edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+        selected = np.empty(n_out, dtype=int)
+        selected[0], selected[-1] = 0, n - 1
+
+        a = 0
+        for i in range(n_out - 2):
+            start, end = edges[i], edges[i + 1]
+            next_end = edges[i + 2] if i + 2 < len(edges) else n
+            next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+            # Pick the point forming the largest triangle with the previous pick and the next bucket mean
+            area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+            a = start + int(np.argmax(area))
+            selected[i + 1] = a
+
+        return selected
+
+    def downsample(self, series, max_points=None):
+        """
+        Downsample a series to the plotting point budget using LTTB.
+        """
+        max_points = max_points or self.max_points
+        series = series.dropna()
+        if len(series) <= max_points:
+            return series
+
+        x = pd.to_datetime(pd.Index(series.index)).asi8.astype(float)
+        y = series.to_numpy(dtype=float)
+        return series.iloc[self.lttb(x, y, max_points)]
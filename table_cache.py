@@ -0,0 +1,189 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+
+# DataTable filter_query operators, in the order they must be matched
+filter_operators = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "]
+]
+
+# Operators without a value, matched before the ones above
+unary_operators = ["is not blank", "is blank", "is not nil", "is nil"]
+
+class PairsTableCache():
+    """
+    A class to keep ranked pair tables on the server and serve DataTable pages from them.
+    """
+
+    def __init__(self, max_queries=8, max_views=16):
+        """
+        Initialize the cache with the number of queries and sorted/filtered views to keep.
+        """
+        self.max_queries = max_queries
+        self.max_views = max_views
+        self.tables = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_pairs(self, key):
+        """
+        Get the ranked pairs for a query, or None if it is not cached.
+        """
+        with self.lock:
+            if key not in self.tables:
+                return None
+            self.tables.move_to_end(key)
+            return self.tables[key]["pairs"]
+
+    def set_pairs(self, key, pairs):
+        """
+        Store the ranked pairs for a query, evicting the least recently used one.
+        """
+        with self.lock:
+            self.tables[key] = {"pairs": pairs.reset_index(drop=True), "views": OrderedDict()}
+            self.tables.move_to_end(key)
+            while len(self.tables) > self.max_queries:
+                self.tables.popitem(last=False)
+
+    def split_filter_part(self, filter_part):
+        """
+        Split one filter_query clause into column name, operator and the raw value string.
+        """
+        for operator in unary_operators:
+            if filter_part.strip().endswith(operator):
+                name_part = filter_part[:filter_part.rfind(operator)]
+                name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+                return name, operator, None
+
+        for operator_type in filter_operators:
+            for operator in operator_type:
+                if operator in filter_part:
+                    name_part, value_part = filter_part.split(operator, 1)
+                    name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+
+                    value = value_part.strip()
+                    v0 = value[0] if value else ""
+                    if v0 and v0 == value[-1] and v0 in ("'", '"', "`"):
+                        value = value[1: -1].replace("\\" + v0, v0)
+
+                    return name, operator_type[0].strip(), value
+
+        return None, None, None
+
+    def filter_mask(self, df, filter_query):
+        """
+        Boolean mask of the pairs matching a DataTable filter_query string.
+        """
+        mask = np.ones(len(df), dtype=bool)
+        if not filter_query:
+            return mask
+
+        for filter_part in filter_query.split(" && "):
+            col_name, operator, filter_value = self.split_filter_part(filter_part)
+
+            # A clause we cannot parse, or on an unknown column, matches nothing
+            if col_name not in df.columns:
+                mask[:] = False
+                continue
+
+            column = df[col_name]
+            if operator in ("is nil", "is not nil"):
+                missing = column.isna().to_numpy()
+                mask &= missing if operator == "is nil" else ~missing
+            elif operator in ("is blank", "is not blank"):
+                blank = (column.isna() | (column.astype(str).str.strip() == "")).to_numpy()
+                mask &= blank if operator == "is blank" else ~blank
+            elif operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+                # Only numeric values can be compared with numeric columns, anything else matches nothing
+                if pd.api.types.is_numeric_dtype(column):
+                    try:
+                        filter_value = float(filter_value)
+                    except ValueError:
+                        mask[:] = False
+                        continue
+                try:
+                    mask &= getattr(column, operator)(filter_value).to_numpy()
+                except TypeError:
+                    mask[:] = False
+            elif operator == "contains":
+                mask &= column.astype(str).str.contains(filter_value, regex=False).to_numpy()
+            elif operator == "datestartswith":
+                mask &= column.astype(str).str.startswith(filter_value).to_numpy()
+
+        return mask
+
+    def sort_positions(self, df, sort_by):
+        """
+        Row positions of the pairs in DataTable sort_by order.
+        """
+        sort_by = [col for col in sort_by or [] if col["column_id"] in df.columns]
+        if not sort_by:
+            return np.arange(len(df))
+
+        return df.sort_values(
+            [col["column_id"] for col in sort_by],
+            ascending=[col["direction"] == "asc" for col in sort_by],
+            kind="mergesort"
+        ).index.to_numpy()
+
+    def get_view(self, key, sort_by, filter_query):
+        """
+        Get the row positions of the filtered and sorted pairs for a query, reusing earlier views.
+        Views hold positions into the cached pairs rather than copies of the frame.
+        """
+        sort_key = tuple((col["column_id"], col["direction"]) for col in sort_by or [])
+        view_key = (sort_key, filter_query or "")
+        sorted_key = (sort_key, "")
+
+        with self.lock:
+            if key not in self.tables:
+                return None, None
+            self.tables.move_to_end(key)
+            entry = self.tables[key]
+            pairs = entry["pairs"]
+            if view_key in entry["views"]:
+                entry["views"].move_to_end(view_key)
+                return pairs, entry["views"][view_key]
+            sorted_positions = entry["views"].get(sorted_key)
+
+        # The cached pairs are never modified, so sort and filter without holding the lock
+        if sorted_positions is None:
+            sorted_positions = self.sort_positions(pairs, sort_by)
+        positions = sorted_positions
+        if filter_query:
+            positions = positions[self.filter_mask(pairs, filter_query)[positions]]
+
+        # Filtering a sorted view keeps its order, so keep the sort for later filters
+        with self.lock:
+            views = entry["views"]
+            views[sorted_key] = sorted_positions
+            views[view_key] = positions
+            while len(views) > self.max_views:
+                views.popitem(last=False)
+
+        return pairs, positions
+
+    def get_page(self, key, page_current, page_size, sort_by=None, filter_query=None):
+        """
+        Get the records for one DataTable page, the total number of pages and the
+        page actually served, which is clamped to the last page of the view.
+        """
+        pairs, positions = self.get_view(key, sort_by, filter_query)
+        if pairs is None:
+            return None, 0, 0
+
+        page_size = max(int(page_size or 1), 1)
+        page_count = max(-(-len(positions) // page_size), 1)
+        page_current = min(max(int(page_current or 0), 0), page_count - 1)
+
+        start = page_current * page_size
+        page = pairs.iloc[positions[start: start + page_size]]
+        return page.to_dict('records'), page_count, page_current